@@ -162,6 +162,12 @@ class Annotations:
                     rels_by_source[annotation.source] = set()
                 rels_by_source[annotation.source].add((target, annotation.namespace))
 
+        if len(rels_by_source) == 1 and not rels_by_source["/"]:
+            # Only our own relationship to the 3D model needs to be written. That document is always the same.
+            with archive.open(RELS_FOLDER + "/.rels", 'w') as f:
+                f.write(DEFAULT_RELS_DOCUMENT)
+            return
+
         for source, annotations in rels_by_source.items():
             if source == "/":  # Writing to the archive root. Don't want to start zipfile paths with a slash.
                 source = ""
@@ -208,6 +214,12 @@ class Annotations:
                     content_types_by_extension[extension] = []
                 content_types_by_extension[extension].append(annotation.mime_type)
 
+        if not content_types_by_extension:
+            # Only the content types of our own files need to be written. That document is always the same.
+            with archive.open(CONTENT_TYPES_LOCATION, 'w') as f:
+                f.write(DEFAULT_CONTENT_TYPES_DOCUMENT)
+            return
+
         # Then find out which is the most common content type to assign to that extension.
         most_common = {}
         for extension, mime_types in content_types_by_extension.items():
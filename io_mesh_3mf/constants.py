@@ -41,11 +41,55 @@ MODEL_NAMESPACES = {
 }
 MODEL_DEFAULT_UNIT = "millimeter"  # If the unit is missing, it will be this.
 
+# Namespace-qualified names of the elements and attributes in the 3D model file.
+# Computed once here, so that they don't need to be formatted again for every element that gets written.
+MODEL_TAG_MODEL = f"{{{MODEL_NAMESPACE}}}model"
+MODEL_TAG_METADATA = f"{{{MODEL_NAMESPACE}}}metadata"
+MODEL_TAG_RESOURCES = f"{{{MODEL_NAMESPACE}}}resources"
+MODEL_TAG_BASEMATERIALS = f"{{{MODEL_NAMESPACE}}}basematerials"
+MODEL_TAG_BASE = f"{{{MODEL_NAMESPACE}}}base"
+MODEL_TAG_OBJECT = f"{{{MODEL_NAMESPACE}}}object"
+MODEL_TAG_MESH = f"{{{MODEL_NAMESPACE}}}mesh"
+MODEL_TAG_VERTICES = f"{{{MODEL_NAMESPACE}}}vertices"
+MODEL_TAG_VERTEX = f"{{{MODEL_NAMESPACE}}}vertex"
+MODEL_TAG_TRIANGLES = f"{{{MODEL_NAMESPACE}}}triangles"
+MODEL_TAG_TRIANGLE = f"{{{MODEL_NAMESPACE}}}triangle"
+MODEL_TAG_COMPONENTS = f"{{{MODEL_NAMESPACE}}}components"
+MODEL_TAG_COMPONENT = f"{{{MODEL_NAMESPACE}}}component"
+MODEL_TAG_METADATAGROUP = f"{{{MODEL_NAMESPACE}}}metadatagroup"
+MODEL_TAG_BUILD = f"{{{MODEL_NAMESPACE}}}build"
+MODEL_TAG_ITEM = f"{{{MODEL_NAMESPACE}}}item"
+MODEL_ATTRIBUTE_ID = f"{{{MODEL_NAMESPACE}}}id"
+MODEL_ATTRIBUTE_NAME = f"{{{MODEL_NAMESPACE}}}name"
+MODEL_ATTRIBUTE_DISPLAYCOLOR = f"{{{MODEL_NAMESPACE}}}displaycolor"
+MODEL_ATTRIBUTE_TYPE = f"{{{MODEL_NAMESPACE}}}type"
+MODEL_ATTRIBUTE_PID = f"{{{MODEL_NAMESPACE}}}pid"
+MODEL_ATTRIBUTE_PINDEX = f"{{{MODEL_NAMESPACE}}}pindex"
+MODEL_ATTRIBUTE_PARTNUMBER = f"{{{MODEL_NAMESPACE}}}partnumber"
+MODEL_ATTRIBUTE_PRESERVE = f"{{{MODEL_NAMESPACE}}}preserve"
+MODEL_ATTRIBUTE_X = f"{{{MODEL_NAMESPACE}}}x"
+MODEL_ATTRIBUTE_Y = f"{{{MODEL_NAMESPACE}}}y"
+MODEL_ATTRIBUTE_Z = f"{{{MODEL_NAMESPACE}}}z"
+MODEL_ATTRIBUTE_V1 = f"{{{MODEL_NAMESPACE}}}v1"
+MODEL_ATTRIBUTE_V2 = f"{{{MODEL_NAMESPACE}}}v2"
+MODEL_ATTRIBUTE_V3 = f"{{{MODEL_NAMESPACE}}}v3"
+MODEL_ATTRIBUTE_P1 = f"{{{MODEL_NAMESPACE}}}p1"
+MODEL_ATTRIBUTE_OBJECTID = f"{{{MODEL_NAMESPACE}}}objectid"
+MODEL_ATTRIBUTE_TRANSFORM = f"{{{MODEL_NAMESPACE}}}transform"
+
 # Constants in the ContentTypes file.
 CONTENT_TYPES_NAMESPACE = "http://schemas.openxmlformats.org/package/2006/content-types"
 CONTENT_TYPES_NAMESPACES = {
     "ct": CONTENT_TYPES_NAMESPACE
 }
+# The [Content_Types].xml file to write when no content types were annotated, which is the case unless the scene was
+# loaded from a 3MF archive. It only holds the content types of the files that this add-on creates by itself.
+DEFAULT_CONTENT_TYPES_DOCUMENT = (
+    "<?xml version='1.0' encoding='UTF-8'?>\n"
+    f"<Types xmlns=\"{CONTENT_TYPES_NAMESPACE}\">"
+    f"<Default Extension=\"rels\" ContentType=\"{RELS_MIMETYPE}\" />"
+    f"<Default Extension=\"model\" ContentType=\"{MODEL_MIMETYPE}\" />"
+    "</Types>").encode("UTF-8")
 
 # Constants in the .rels files.
 RELS_NAMESPACE = "http://schemas.openxmlformats.org/package/2006/relationships"
@@ -53,3 +97,9 @@ RELS_NAMESPACES = {  # Namespaces used for the rels files.
     "rel": RELS_NAMESPACE
 }
 RELS_RELATIONSHIP_FIND = "rel:Relationship"
+# The root .rels file to write when no relationships were annotated. It only refers to the 3D model.
+DEFAULT_RELS_DOCUMENT = (
+    "<?xml version='1.0' encoding='UTF-8'?>\n"
+    f"<Relationships xmlns=\"{RELS_NAMESPACE}\">"
+    f"<Relationship Id=\"rel0\" Target=\"/{MODEL_LOCATION}\" Type=\"{MODEL_REL}\" />"
+    "</Relationships>").encode("UTF-8")
@@ -10,6 +10,7 @@
 
 # <pep8 compliant>
 
+import array  # To receive the mesh data from Blender in bulk.
 import base64  # To decode files that must be preserved.
 import bpy  # The Blender API.
 import bpy.props  # To define metadata properties for the operator.
@@ -17,10 +18,11 @@ import bpy.types  # This class is an operator in Blender, and to find meshes in
 import bpy_extras.io_utils  # Helper functions to export meshes more easily.
 import bpy_extras.node_shader_utils  # Converting material colors to sRGB.
 import collections  # Counter, to find the most common material of an object.
-import itertools
+import io  # To buffer writes to the archive.
 import logging  # To debug and log progress.
 import mathutils  # For the transformation matrices.
 import xml.etree.ElementTree  # To write XML documents with the 3D model data.
+import xml.sax.saxutils  # To escape text and attribute values when serializing the XML documents.
 import zipfile  # To write zip archives, the shell of the 3MF file.
 
 from .annotations import Annotations  # To store file annotations
@@ -30,6 +32,9 @@ from .unit_conversions import blender_to_metre, threemf_to_metre
 
 log = logging.getLogger(__name__)
 
+# Transformations equal to this don't need to be written to the file. Created once, and frozen to keep it that way.
+IDENTITY_MATRIX = mathutils.Matrix.Identity(4).freeze()
+
 
 class Export3MF(bpy.types.Operator, bpy_extras.io_utils.ExportHelper):
     """
@@ -67,6 +72,12 @@ class Export3MF(bpy.types.Operator, bpy_extras.io_utils.ExportHelper):
         default=4,
         min=0,
         max=12)
+    compression_level: bpy.props.IntProperty(
+        name="Compression",
+        description="How strongly to compress the file. Higher levels give slightly smaller files, but are slower.",
+        default=1,
+        min=0,
+        max=9)
 
     def __init__(self):
         """
@@ -105,19 +116,30 @@ class Export3MF(bpy.types.Operator, bpy_extras.io_utils.ExportHelper):
         # Due to an open bug in Python 3.7 (Blender's version) we need to prefix all elements with the namespace.
         # Bug: https://bugs.python.org/issue17088
         # Workaround: https://stackoverflow.com/questions/4997848/4999510#4999510
-        root = xml.etree.ElementTree.Element(f"{{{MODEL_NAMESPACE}}}model")
-
-        scene_metadata = Metadata()
-        scene_metadata.retrieve(bpy.context.scene)
-        self.write_metadata(root, scene_metadata)
-
-        resources_element = xml.etree.ElementTree.SubElement(root, f"{{{MODEL_NAMESPACE}}}resources")
-        self.material_name_to_index = self.write_materials(resources_element, blender_objects)
-        self.write_objects(root, resources_element, blender_objects, global_scale)
-
-        document = xml.etree.ElementTree.ElementTree(root)
-        with archive.open(MODEL_LOCATION, 'w', force_zip64=True) as f:
-            document.write(f, xml_declaration=True, encoding='UTF-8', default_namespace=MODEL_NAMESPACE)
+        root = xml.etree.ElementTree.Element(MODEL_TAG_MODEL)
+        resources_element = xml.etree.ElementTree.Element(MODEL_TAG_RESOURCES)
+
+        # The document is streamed into the archive. Rather than building the XML tree for the entire scene, elements
+        # are serialized as soon as they are complete and then dropped from the tree. This way only the elements of one
+        # object need to be held in memory at a time.
+        # The many small writes are buffered, since every write to the archive needs to update the checksum and go
+        # through the compressor.
+        with io.BufferedWriter(archive.open(MODEL_LOCATION, 'w', force_zip64=True), buffer_size=1024 * 1024) as f:
+            f.write(f"<?xml version='1.0' encoding='UTF-8'?>\n<model xmlns=\"{MODEL_NAMESPACE}\">".encode("UTF-8"))
+
+            scene_metadata = Metadata()
+            scene_metadata.retrieve(bpy.context.scene)
+            self.write_metadata(root, scene_metadata)
+            self.flush_children(f, root)
+
+            f.write(b"<resources>")
+            self.material_name_to_index = self.write_materials(resources_element, blender_objects)
+            self.write_objects(root, resources_element, blender_objects, global_scale, model_stream=f)
+            self.flush_children(f, resources_element)
+            f.write(b"</resources>")
+
+            self.flush_children(f, root)  # The <build> element.
+            f.write(b"</model>")
         try:
             archive.close()
         except EnvironmentError as e:
@@ -138,7 +160,14 @@ class Export3MF(bpy.types.Operator, bpy_extras.io_utils.ExportHelper):
         :return: A zip archive that other functions can add things to.
         """
         try:
-            archive = zipfile.ZipFile(filepath, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=9)
+            if self.compression_level > 0:
+                archive = zipfile.ZipFile(
+                    filepath,
+                    'w',
+                    compression=zipfile.ZIP_DEFLATED,
+                    compresslevel=self.compression_level)
+            else:  # Deflate's level 0 would still add its own overhead. Store the files as they are instead.
+                archive = zipfile.ZipFile(filepath, 'w', compression=zipfile.ZIP_STORED)
 
             # Store the file annotations we got from imported 3MF files, and store them in the archive.
             annotations = Annotations()
@@ -180,17 +209,30 @@ class Export3MF(bpy.types.Operator, bpy_extras.io_utils.ExportHelper):
         to make the coordinates in the file larger than the coordinates in Blender.
         """
         scale = self.global_scale
+        unit_settings = context.scene.unit_settings
 
-        if context.scene.unit_settings.scale_length != 0:
-            scale *= context.scene.unit_settings.scale_length  # Apply the global scale of the units in Blender.
+        if unit_settings.scale_length != 0:
+            scale *= unit_settings.scale_length  # Apply the global scale of the units in Blender.
 
         threemf_unit = MODEL_DEFAULT_UNIT
-        blender_unit = context.scene.unit_settings.length_unit
+        blender_unit = unit_settings.length_unit
         scale /= threemf_to_metre[threemf_unit]  # Convert 3MF units to metre.
         scale *= blender_to_metre[blender_unit]  # Convert metre to Blender's units.
 
         return scale
 
+    def allocate_resource_id(self):
+        """
+        Reserves a resource ID for a new resource in the document.
+
+        The IDs are handed out by a simple counter, so this takes constant time regardless of how many resources were
+        written before.
+        :return: A resource ID that is unique within the document.
+        """
+        resource_id = self.next_resource_id
+        self.next_resource_id += 1
+        return resource_id
+
     def write_materials(self, resources_element, blender_objects):
         """
         Write the materials on the specified blender objects to a 3MF document.
@@ -235,33 +277,34 @@ class Export3MF(bpy.types.Operator, bpy_extras.io_utils.ExportHelper):
                     color_hex = "#%0.2X%0.2X%0.2X%0.2X" % (red, green, blue, alpha)
 
                 if basematerials_element is None:
-                    self.material_resource_id = str(self.next_resource_id)
-                    self.next_resource_id += 1
+                    self.material_resource_id = str(self.allocate_resource_id())
                     basematerials_element = xml.etree.ElementTree.SubElement(
                         resources_element,
-                        f"{{{MODEL_NAMESPACE}}}basematerials", attrib={
-                            f"{{{MODEL_NAMESPACE}}}id": self.material_resource_id
+                        MODEL_TAG_BASEMATERIALS, attrib={
+                            MODEL_ATTRIBUTE_ID: self.material_resource_id
                         })
-                xml.etree.ElementTree.SubElement(basematerials_element, f"{{{MODEL_NAMESPACE}}}base", attrib={
-                    f"{{{MODEL_NAMESPACE}}}name": material_name,
-                    f"{{{MODEL_NAMESPACE}}}displaycolor": color_hex
+                xml.etree.ElementTree.SubElement(basematerials_element, MODEL_TAG_BASE, attrib={
+                    MODEL_ATTRIBUTE_NAME: material_name,
+                    MODEL_ATTRIBUTE_DISPLAYCOLOR: color_hex
                 })
                 name_to_index[material_name] = next_index
                 next_index += 1
 
         return name_to_index
 
-    def write_objects(self, root, resources_element, blender_objects, global_scale):
+    def write_objects(self, root, resources_element, blender_objects, global_scale, model_stream=None):
         """
         Writes a group of objects into the 3MF archive.
         :param root: An XML root element to write the objects into.
         :param resources_element: An XML element to write resources into.
         :param blender_objects: A list of Blender objects that need to be written to that XML element.
         :param global_scale: A scaling factor to apply to all objects to convert the units.
+        :param model_stream: If provided, the resources of each object are written to this stream as soon as they are
+        complete, and removed from the resources element.
         """
         transformation = mathutils.Matrix.Scale(global_scale, 4)
 
-        build_element = xml.etree.ElementTree.SubElement(root, f"{{{MODEL_NAMESPACE}}}build")
+        build_element = xml.etree.ElementTree.SubElement(root, MODEL_TAG_BUILD)
         for blender_object in blender_objects:
             if blender_object.parent is not None:
                 continue  # Only write objects that have no parent, since we'll get the child objects recursively.
@@ -269,24 +312,27 @@ class Export3MF(bpy.types.Operator, bpy_extras.io_utils.ExportHelper):
                 continue
 
             objectid, mesh_transformation = self.write_object_resource(resources_element, blender_object)
+            if model_stream is not None:  # This object's resources are complete, so they can be written out.
+                self.flush_children(model_stream, resources_element)
 
-            item_element = xml.etree.ElementTree.SubElement(build_element, f"{{{MODEL_NAMESPACE}}}item")
+            item_element = xml.etree.ElementTree.SubElement(build_element, MODEL_TAG_ITEM)
             self.num_written += 1
-            item_element.attrib[f"{{{MODEL_NAMESPACE}}}objectid"] = str(objectid)
-            mesh_transformation = transformation @ mesh_transformation
-            if mesh_transformation != mathutils.Matrix.Identity(4):
-                item_element.attrib[f"{{{MODEL_NAMESPACE}}}transform"] =\
+            item_element.attrib[MODEL_ATTRIBUTE_OBJECTID] = str(objectid)
+            if global_scale != 1.0:  # Scaling by 1 would leave the transformation unchanged.
+                mesh_transformation = transformation @ mesh_transformation
+            if mesh_transformation != IDENTITY_MATRIX:
+                item_element.attrib[MODEL_ATTRIBUTE_TRANSFORM] =\
                     self.format_transformation(mesh_transformation)
 
             metadata = Metadata()
             metadata.retrieve(blender_object)
             if "3mf:partnumber" in metadata:
-                item_element.attrib[f"{{{MODEL_NAMESPACE}}}partnumber"] = metadata["3mf:partnumber"].value
+                item_element.attrib[MODEL_ATTRIBUTE_PARTNUMBER] = metadata["3mf:partnumber"].value
                 del metadata["3mf:partnumber"]
             if metadata:
                 metadatagroup_element = xml.etree.ElementTree.SubElement(
                     item_element,
-                    f"{{{MODEL_NAMESPACE}}}metadatagroup")
+                    MODEL_TAG_METADATAGROUP)
                 self.write_metadata(metadatagroup_element, metadata)
 
     def write_object_resource(self, resources_element, blender_object):
@@ -302,17 +348,17 @@ class Export3MF(bpy.types.Operator, bpy_extras.io_utils.ExportHelper):
         :return: A tuple, containing the object ID of the newly written resource and a transformation matrix that this
         resource must be saved with.
         """
-        new_resource_id = self.next_resource_id
-        self.next_resource_id += 1
-        object_element = xml.etree.ElementTree.SubElement(resources_element, f"{{{MODEL_NAMESPACE}}}object")
-        object_element.attrib[f"{{{MODEL_NAMESPACE}}}id"] = str(new_resource_id)
+        new_resource_id = self.allocate_resource_id()
+        object_element = xml.etree.ElementTree.SubElement(resources_element, MODEL_TAG_OBJECT, attrib={
+            MODEL_ATTRIBUTE_ID: str(new_resource_id)
+        })
 
         metadata = Metadata()
         metadata.retrieve(blender_object)
         if "3mf:object_type" in metadata:
             object_type = metadata["3mf:object_type"].value
             if object_type != "model":  # Only write if not the default.
-                object_element.attrib[f"{{{MODEL_NAMESPACE}}}type"] = object_type
+                object_element.attrib[MODEL_ATTRIBUTE_TYPE] = object_type
             del metadata["3mf:object_type"]
 
         if blender_object.mode == 'EDIT':
@@ -323,7 +369,7 @@ class Export3MF(bpy.types.Operator, bpy_extras.io_utils.ExportHelper):
         if child_objects:  # Only write the <components> tag if there are actually components.
             components_element = xml.etree.ElementTree.SubElement(
                 object_element,
-                f"{{{MODEL_NAMESPACE}}}components")
+                MODEL_TAG_COMPONENTS)
             for child in blender_object.children:
                 if child.type != 'MESH':
                     continue
@@ -334,11 +380,12 @@ class Export3MF(bpy.types.Operator, bpy_extras.io_utils.ExportHelper):
                 child_transformation = mesh_transformation.inverted_safe() @ child_transformation
                 component_element = xml.etree.ElementTree.SubElement(
                     components_element,
-                    f"{{{MODEL_NAMESPACE}}}component")
+                    MODEL_TAG_COMPONENT, attrib={
+                        MODEL_ATTRIBUTE_OBJECTID: str(child_id)
+                    })
                 self.num_written += 1
-                component_element.attrib[f"{{{MODEL_NAMESPACE}}}objectid"] = str(child_id)
-                if child_transformation != mathutils.Matrix.Identity(4):
-                    component_element.attrib[f"{{{MODEL_NAMESPACE}}}transform"] =\
+                if child_transformation != IDENTITY_MATRIX:
+                    component_element.attrib[MODEL_ATTRIBUTE_TRANSFORM] =\
                         self.format_transformation(child_transformation)
 
         # In the tail recursion, get the vertex data.
@@ -355,71 +402,76 @@ class Export3MF(bpy.types.Operator, bpy_extras.io_utils.ExportHelper):
         if mesh is None:
             return new_resource_id, mesh_transformation
 
-        # Need to convert this to triangles-only, because 3MF doesn't support faces with more than 3 vertices.
-        mesh.calc_loop_triangles()
-
-        if len(mesh.vertices) > 0:  # Only write a <mesh> tag if there is mesh data.
-            # If this object already contains components, we can't also store a mesh. So create a new object and use
-            # that object as another component.
-            if child_objects:
-                mesh_id = self.next_resource_id
-                self.next_resource_id += 1
-                mesh_object_element = xml.etree.ElementTree.SubElement(
-                    resources_element,
-                    f"{{{MODEL_NAMESPACE}}}object")
-                mesh_object_element.attrib[f"{{{MODEL_NAMESPACE}}}id"] = str(mesh_id)
-                component_element = xml.etree.ElementTree.SubElement(
-                    components_element,
-                    f"{{{MODEL_NAMESPACE}}}component")
-                self.num_written += 1
-                component_element.attrib[f"{{{MODEL_NAMESPACE}}}objectid"] = str(mesh_id)
-            else:  # No components, then we can write directly into this object resource.
-                mesh_object_element = object_element
-            mesh_element = xml.etree.ElementTree.SubElement(mesh_object_element, f"{{{MODEL_NAMESPACE}}}mesh")
-
-            # Find the most common material for this mesh, for maximum compression.
-            material_indices = [triangle.material_index for triangle in mesh.loop_triangles]
-            # If there are no triangles, we provide 0 as index, but it'll not get read by write_triangles either then.
-            most_common_material_list_index = 0
-
-            if material_indices and blender_object.material_slots:
-                counter = collections.Counter(material_indices)
-                # most_common_material_object_index is an index from the MeshLoopTriangle, referring to the list of
-                # materials attached to the Blender object.
-                most_common_material_object_index = counter.most_common(1)[0][0]
-                most_common_material = blender_object.material_slots[most_common_material_object_index].material
-                # most_common_material_list_index is an index referring to our own list of materials that we put in the
-                # resources.
-                most_common_material_list_index = self.material_name_to_index[most_common_material.name]
-                # We always only write one group of materials. The resource ID was determined when it was written.
-                object_element.attrib[f"{{{MODEL_NAMESPACE}}}pid"] = str(self.material_resource_id)
-                object_element.attrib[f"{{{MODEL_NAMESPACE}}}pindex"] = str(most_common_material_list_index)
-
-            self.write_vertices(mesh_element, mesh.vertices)
-            self.write_triangles(
-                mesh_element,
-                mesh.loop_triangles,
-                most_common_material_list_index,
-                blender_object.material_slots)
-
-            # If the object has metadata, write that to a metadata object.
-            if "3mf:partnumber" in metadata:
-                mesh_object_element.attrib[f"{{{MODEL_NAMESPACE}}}partnumber"] =\
-                    metadata["3mf:partnumber"].value
-                del metadata["3mf:partnumber"]
-            if "3mf:object_type" in metadata:
-                object_type = metadata["3mf:object_type"].value
-                if object_type != "model" and object_type != "other":
-                    # Only write if not the default.
-                    # Don't write "other" object types since we're not allowed to refer to them. Pretend they are normal
-                    # models.
-                    mesh_object_element.attrib[f"{{{MODEL_NAMESPACE}}}type"] = object_type
-                del metadata["3mf:object_type"]
-            if metadata:
-                metadatagroup_element = xml.etree.ElementTree.SubElement(
-                    object_element,
-                    f"{{{MODEL_NAMESPACE}}}metadatagroup")
-                self.write_metadata(metadatagroup_element, metadata)
+        # The mesh is a temporary copy (with modifiers applied, if requested). Release it again once we're done with it,
+        # rather than leaving it for Blender to clean up when the object gets evaluated again.
+        try:
+            # Need to convert this to triangles-only, because 3MF doesn't support faces with more than 3 vertices.
+            mesh.calc_loop_triangles()
+
+            if len(mesh.vertices) > 0:  # Only write a <mesh> tag if there is mesh data.
+                # If this object already contains components, we can't also store a mesh. So create a new object and use
+                # that object as another component.
+                if child_objects:
+                    mesh_id = self.allocate_resource_id()
+                    mesh_object_element = xml.etree.ElementTree.SubElement(
+                        resources_element,
+                        MODEL_TAG_OBJECT, attrib={
+                            MODEL_ATTRIBUTE_ID: str(mesh_id)
+                        })
+                    xml.etree.ElementTree.SubElement(components_element, MODEL_TAG_COMPONENT, attrib={
+                        MODEL_ATTRIBUTE_OBJECTID: str(mesh_id)
+                    })
+                    self.num_written += 1
+                else:  # No components, then we can write directly into this object resource.
+                    mesh_object_element = object_element
+                mesh_element = xml.etree.ElementTree.SubElement(mesh_object_element, MODEL_TAG_MESH)
+
+                # Find the most common material for this mesh, for maximum compression.
+                material_indices = [triangle.material_index for triangle in mesh.loop_triangles]
+                # If there are no triangles, we provide 0 as index, but it'll not get read by write_triangles either
+                # then.
+                most_common_material_list_index = 0
+
+                if material_indices and blender_object.material_slots:
+                    counter = collections.Counter(material_indices)
+                    # most_common_material_object_index is an index from the MeshLoopTriangle, referring to the list of
+                    # materials attached to the Blender object.
+                    most_common_material_object_index = counter.most_common(1)[0][0]
+                    most_common_material = blender_object.material_slots[most_common_material_object_index].material
+                    # most_common_material_list_index is an index referring to our own list of materials that we put in
+                    # the resources.
+                    most_common_material_list_index = self.material_name_to_index[most_common_material.name]
+                    # We always only write one group of materials. The resource ID was determined when it was written.
+                    object_element.attrib[MODEL_ATTRIBUTE_PID] = str(self.material_resource_id)
+                    object_element.attrib[MODEL_ATTRIBUTE_PINDEX] = str(most_common_material_list_index)
+
+                self.write_vertices(mesh_element, mesh.vertices)
+                self.write_triangles(
+                    mesh_element,
+                    mesh.loop_triangles,
+                    most_common_material_list_index,
+                    blender_object.material_slots)
+
+                # If the object has metadata, write that to a metadata object.
+                if "3mf:partnumber" in metadata:
+                    mesh_object_element.attrib[MODEL_ATTRIBUTE_PARTNUMBER] =\
+                        metadata["3mf:partnumber"].value
+                    del metadata["3mf:partnumber"]
+                if "3mf:object_type" in metadata:
+                    object_type = metadata["3mf:object_type"].value
+                    if object_type != "model" and object_type != "other":
+                        # Only write if not the default.
+                        # Don't write "other" object types since we're not allowed to refer to them. Pretend they are
+                        # normal models.
+                        mesh_object_element.attrib[MODEL_ATTRIBUTE_TYPE] = object_type
+                    del metadata["3mf:object_type"]
+                if metadata:
+                    metadatagroup_element = xml.etree.ElementTree.SubElement(
+                        object_element,
+                        MODEL_TAG_METADATAGROUP)
+                    self.write_metadata(metadatagroup_element, metadata)
+        finally:
+            blender_object.to_mesh_clear()
 
         return new_resource_id, mesh_transformation
 
@@ -430,14 +482,85 @@ class Export3MF(bpy.types.Operator, bpy_extras.io_utils.ExportHelper):
         :param metadata: The collection of metadata to write to that node.
         """
         for metadata_entry in metadata.values():
-            metadata_node = xml.etree.ElementTree.SubElement(node, f"{{{MODEL_NAMESPACE}}}metadata")
-            metadata_node.attrib[f"{{{MODEL_NAMESPACE}}}name"] = metadata_entry.name
+            # Collect the attributes first, so that the element gets its attribute dictionary at once.
+            attributes = {MODEL_ATTRIBUTE_NAME: metadata_entry.name}
             if metadata_entry.preserve:
-                metadata_node.attrib[f"{{{MODEL_NAMESPACE}}}preserve"] = "1"
+                attributes[MODEL_ATTRIBUTE_PRESERVE] = "1"
             if metadata_entry.datatype:
-                metadata_node.attrib[f"{{{MODEL_NAMESPACE}}}type"] = metadata_entry.datatype
+                attributes[MODEL_ATTRIBUTE_TYPE] = metadata_entry.datatype
+            metadata_node = xml.etree.ElementTree.SubElement(node, MODEL_TAG_METADATA, attrib=attributes)
             metadata_node.text = metadata_entry.value
 
+    def flush_children(self, stream, element):
+        """
+        Serializes the child elements of an XML element to a stream, and then removes them from the element.
+
+        This allows writing the document incrementally, so the elements of the whole document don't need to be in
+        memory at the same time.
+        :param stream: A binary stream to write the serialized elements to.
+        :param element: The element of which to write the children.
+        """
+        for child in element:
+            self.write_element(stream, child)
+        del element[:]
+
+    def write_element(self, stream, element):
+        """
+        Serializes an XML element and all of its descendants to a stream.
+
+        All elements and attributes must be in the 3MF model namespace, which the document declares as its default
+        namespace. They are written without namespace prefix then.
+
+        The vertices and triangles make up nearly all of the document. Their attributes are always numbers, which never
+        need to be escaped, so they are written with a fixed template. This is much faster than ElementTree's own
+        serializer, which inspects the namespace of every element and escapes every attribute.
+        :param stream: A binary stream to write the serialized element to.
+        :param element: The element to serialize.
+        """
+        if element.tag == MODEL_TAG_VERTICES:
+            vertices = "".join([
+                "<vertex x=\"%s\" y=\"%s\" z=\"%s\"/>" % (
+                    attrib[MODEL_ATTRIBUTE_X],
+                    attrib[MODEL_ATTRIBUTE_Y],
+                    attrib[MODEL_ATTRIBUTE_Z]
+                ) for attrib in (vertex.attrib for vertex in element)])
+            # Write the wrapping tags separately, so that the (large) contents don't need to be copied to append them.
+            stream.write(b"<vertices>")
+            stream.write(vertices.encode("UTF-8"))
+            stream.write(b"</vertices>")
+            return
+        if element.tag == MODEL_TAG_TRIANGLES:
+            triangles = []
+            for attrib in (triangle.attrib for triangle in element):
+                if MODEL_ATTRIBUTE_P1 in attrib:  # This triangle overrides the material of its object.
+                    triangles.append("<triangle v1=\"%s\" v2=\"%s\" v3=\"%s\" p1=\"%s\"/>" % (
+                        attrib[MODEL_ATTRIBUTE_V1],
+                        attrib[MODEL_ATTRIBUTE_V2],
+                        attrib[MODEL_ATTRIBUTE_V3],
+                        attrib[MODEL_ATTRIBUTE_P1]))
+                else:
+                    triangles.append("<triangle v1=\"%s\" v2=\"%s\" v3=\"%s\"/>" % (
+                        attrib[MODEL_ATTRIBUTE_V1],
+                        attrib[MODEL_ATTRIBUTE_V2],
+                        attrib[MODEL_ATTRIBUTE_V3]))
+            stream.write(b"<triangles>")
+            stream.write("".join(triangles).encode("UTF-8"))
+            stream.write(b"</triangles>")
+            return
+
+        prefix_length = len(MODEL_NAMESPACE) + 2  # Length of the "{namespace}" part of the names, to strip off.
+        name = element.tag[prefix_length:]
+        start_tag = "<" + name + "".join([
+            " " + key[prefix_length:] + "=" + xml.sax.saxutils.quoteattr(value)
+            for key, value in element.attrib.items()])
+        if len(element) == 0 and not element.text:
+            stream.write((start_tag + "/>").encode("UTF-8"))
+            return
+        stream.write((start_tag + ">" + xml.sax.saxutils.escape(element.text or "")).encode("UTF-8"))
+        for child in element:
+            self.write_element(stream, child)
+        stream.write(("</" + name + ">").encode("UTF-8"))
+
     def format_transformation(self, transformation):
         """
         Formats a transformation matrix in 3MF's formatting.
@@ -446,13 +569,10 @@ class Export3MF(bpy.types.Operator, bpy_extras.io_utils.ExportHelper):
         :param transformation: The transformation matrix to format.
         :return: A serialisation of the transformation matrix.
         """
-        pieces = (row[:3] for row in transformation.transposed())  # Don't convert the 4th column.
-        result = ""
-        for cell in itertools.chain.from_iterable(pieces):
-            if result != "":  # First loop, don't put a space in.
-                result += " "
-            result += self.format_number(cell, 6)  # Never use scientific notation!
-        return result
+        # Read the columns directly rather than transposing a copy of the matrix. Don't convert the 4th row.
+        cells = [cell for column in transformation.col for cell in column[:3]]
+        # Never use scientific notation! So don't use %g here, but our own formatting with a fixed number of decimals.
+        return " ".join([self.format_number(cell, 6) for cell in cells])
 
     def write_vertices(self, mesh_element, vertices):
         """
@@ -460,21 +580,39 @@ class Export3MF(bpy.types.Operator, bpy_extras.io_utils.ExportHelper):
 
         This then becomes a resource that can be used in a build.
         :param mesh_element: The <mesh> element of the 3MF document.
-        :param vertices: A list of Blender vertices to add.
+        :param vertices: A list of Blender vertices to add, or a collection of them from a Blender mesh.
         """
-        vertices_element = xml.etree.ElementTree.SubElement(mesh_element, f"{{{MODEL_NAMESPACE}}}vertices")
+        # Build the <vertices> element with a tree builder, which is quicker than adding the elements one by one with
+        # SubElement. The attributes are passed at once, so that each attribute dictionary is built in one go.
+        builder = xml.etree.ElementTree.TreeBuilder()
+        builder.start(MODEL_TAG_VERTICES, {})
+
+        # Look these up only once, rather than for every coordinate.
+        format_number = self.format_number
+        precision = self.coordinate_precision
+        start = builder.start
+        end = builder.end
+
+        if hasattr(vertices, "foreach_get"):
+            # Blender's collections can copy all coordinates into a flat buffer at once. That is much quicker than
+            # reading the coordinates of each vertex through the Python API.
+            coordinates = array.array('f', [0.0]) * (len(vertices) * 3)
+            vertices.foreach_get("co", coordinates)
+            iterator = iter(coordinates)
+            coordinate_triples = zip(iterator, iterator, iterator)
+        else:
+            coordinate_triples = (vertex.co for vertex in vertices)
 
-        # Precompute some names for better performance.
-        vertex_name = f"{{{MODEL_NAMESPACE}}}vertex"
-        x_name = f"{{{MODEL_NAMESPACE}}}x"
-        y_name = f"{{{MODEL_NAMESPACE}}}y"
-        z_name = f"{{{MODEL_NAMESPACE}}}z"
+        for x, y, z in coordinate_triples:  # Create the <vertex> elements.
+            start(MODEL_TAG_VERTEX, {
+                MODEL_ATTRIBUTE_X: format_number(x, precision),
+                MODEL_ATTRIBUTE_Y: format_number(y, precision),
+                MODEL_ATTRIBUTE_Z: format_number(z, precision)
+            })
+            end(MODEL_TAG_VERTEX)
 
-        for vertex in vertices:  # Create the <vertex> elements.
-            vertex_element = xml.etree.ElementTree.SubElement(vertices_element, vertex_name)
-            vertex_element.attrib[x_name] = self.format_number(vertex.co[0], self.coordinate_precision)
-            vertex_element.attrib[y_name] = self.format_number(vertex.co[1], self.coordinate_precision)
-            vertex_element.attrib[z_name] = self.format_number(vertex.co[2], self.coordinate_precision)
+        builder.end(MODEL_TAG_VERTICES)
+        mesh_element.append(builder.close())
 
     def write_triangles(self, mesh_element, triangles, object_material_list_index, material_slots):
         """
@@ -488,39 +626,65 @@ class Export3MF(bpy.types.Operator, bpy_extras.io_utils.ExportHelper):
         :param material_slots: List of materials belonging to the object for which we write triangles. These are
         necessary to interpret the material indices stored in the MeshLoopTriangles.
         """
-        triangles_element = xml.etree.ElementTree.SubElement(mesh_element, f"{{{MODEL_NAMESPACE}}}triangles")
-
-        # Precompute some names for better performance.
-        triangle_name = f"{{{MODEL_NAMESPACE}}}triangle"
-        v1_name = f"{{{MODEL_NAMESPACE}}}v1"
-        v2_name = f"{{{MODEL_NAMESPACE}}}v2"
-        v3_name = f"{{{MODEL_NAMESPACE}}}v3"
-        p1_name = f"{{{MODEL_NAMESPACE}}}p1"
-
-        for triangle in triangles:
-            triangle_element = xml.etree.ElementTree.SubElement(triangles_element, triangle_name)
-            triangle_element.attrib[v1_name] = str(triangle.vertices[0])
-            triangle_element.attrib[v2_name] = str(triangle.vertices[1])
-            triangle_element.attrib[v3_name] = str(triangle.vertices[2])
-
-            if triangle.material_index < len(material_slots):
-                # Convert to index in our global list.
-                material_index = self.material_name_to_index[material_slots[triangle.material_index].material.name]
+        # Like the vertices, build the <triangles> element with a tree builder.
+        builder = xml.etree.ElementTree.TreeBuilder()
+        builder.start(MODEL_TAG_TRIANGLES, {})
+
+        # Convert the material slots of the object to indices in our global list once, rather than for every triangle.
+        slot_to_index = [self.material_name_to_index[material_slot.material.name] for material_slot in material_slots]
+        num_slots = len(slot_to_index)
+        start = builder.start
+        end = builder.end
+
+        if hasattr(triangles, "foreach_get"):  # Like the vertices, copy the data from Blender's collection at once.
+            num_triangles = len(triangles)
+            vertex_indices = array.array('i', [0]) * (num_triangles * 3)
+            triangles.foreach_get("vertices", vertex_indices)
+            material_indices = array.array('i', [0]) * num_triangles
+            triangles.foreach_get("material_index", material_indices)
+            iterator = iter(vertex_indices)
+            triangle_data = zip(iterator, iterator, iterator, material_indices)
+        else:
+            triangle_data = (
+                (triangle.vertices[0], triangle.vertices[1], triangle.vertices[2], triangle.material_index)
+                for triangle in triangles)
+
+        for v1, v2, v3, object_material_index in triangle_data:
+            attributes = {
+                MODEL_ATTRIBUTE_V1: str(v1),
+                MODEL_ATTRIBUTE_V2: str(v2),
+                MODEL_ATTRIBUTE_V3: str(v3)
+            }
+
+            if object_material_index < num_slots:
+                material_index = slot_to_index[object_material_index]
                 if material_index != object_material_list_index:
                     # Not equal to the index that our parent object was written with, so we must override it here.
-                    triangle_element.attrib[p1_name] = str(material_index)
+                    attributes[MODEL_ATTRIBUTE_P1] = str(material_index)
+
+            start(MODEL_TAG_TRIANGLE, attributes)
+            end(MODEL_TAG_TRIANGLE)
+
+        builder.end(MODEL_TAG_TRIANGLES)
+        mesh_element.append(builder.close())
 
     def format_number(self, number, decimals):
         """
         Properly formats a floating point number to a certain precision.
 
         This format will never use scientific notation (no 3.14e-5 nonsense) and will have a fixed limit to the number
-        of decimals. It will not have a limit to the length of the integer part. Any trailing zeros are stripped.
+        of decimals. It will not have a limit to the length of the integer part. Any trailing zeros after the radix are
+        stripped.
         :param number: A floating point number to format.
         :param decimals: The maximum number of places after the radix to write.
         :return: A string representing that number.
         """
-        formatted = ("{:." + str(decimals) + "f}").format(number).rstrip("0").rstrip(".")
-        if formatted == "":
+        if number % 1 == 0:  # Whole numbers are common (e.g. modelled on a grid), and much quicker to format as int.
+            return str(int(number))
+        # The precision is passed as argument (the *), so that no format specification needs to be built for every call.
+        formatted = "%.*f" % (decimals, number)
+        if decimals > 0:  # Only strip the zeros after the radix. Without decimals, the zeros are part of the integer.
+            formatted = formatted.rstrip("0").rstrip(".")
+        if formatted == "-0":  # Small negative numbers round to zero, but don't need a sign then.
             return "0"
         return formatted
@@ -468,6 +468,10 @@ class Import3MF(bpy.types.Operator, bpy_extras.io_utils.ImportHelper):
 
             vertices = self.read_vertices(object_node)
             triangles, materials = self.read_triangles(object_node, material, pid)
+            # The mesh data is converted now, so drop its elements from the document. That way they don't take up memory
+            # any more while the objects are built in the scene.
+            for mesh_node in object_node.findall("./3mf:mesh", MODEL_NAMESPACES):
+                object_node.remove(mesh_node)
             components = self.read_components(object_node)
             metadata = Metadata()
             for metadata_node in object_node.iterfind("./3mf:metadatagroup", MODEL_NAMESPACES):
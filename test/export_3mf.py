@@ -10,14 +10,17 @@
 
 # <pep8 compliant>
 
+import io  # To capture the output of streamed documents.
 import os  # To save archives to a temporary file.
 import mathutils  # To mock parameters and return values that are transformations.
 import tempfile  # To save archives to a temporary file.
 import unittest  # To run the tests.
 import unittest.mock  # To mock away the Blender API.
 import xml.etree.ElementTree  # To construct empty documents for the functions to build elements in.
+import zipfile  # To inspect the archives that were written.
 
 from .mock.bpy import MockOperator, MockExportHelper, MockImportHelper, MockPrincipledBSDFWrapper
+from .mock.bpy import MockCollection, MockVertex, MockLoopTriangle
 
 # The import and export classes inherit from classes from the Blender API. These classes would be MagicMocks as well.
 # However their metaclasses are then also MagicMocks, but different instances of MagicMock.
@@ -47,6 +50,7 @@ class TestExport3MF(unittest.TestCase):
         self.exporter = io_mesh_3mf.export_3mf.Export3MF()  # An exporter class.
         self.exporter.use_mesh_modifiers = False
         self.exporter.coordinate_precision = 4
+        self.exporter.compression_level = 1
 
         self.mock_triangle_loop = unittest.mock.MagicMock()
         self.mock_triangle_loop.material_index = 0
@@ -75,6 +79,36 @@ class TestExport3MF(unittest.TestCase):
             if file_path is not None:
                 os.remove(file_path)
 
+    def test_create_archive_compression(self):
+        """
+        Tests whether the files in the archive get compressed according to the compression level.
+        """
+        for compression_level, compress_type in ((0, zipfile.ZIP_STORED), (1, zipfile.ZIP_DEFLATED)):
+            with self.subTest(compression_level=compression_level):
+                self.exporter.compression_level = compression_level
+                file_path = None
+                archive = None
+                try:
+                    file_handle, file_path = tempfile.mkstemp()
+                    os.close(file_handle)
+                    archive = self.exporter.create_archive(file_path)
+                    with archive.open(MODEL_LOCATION, 'w') as f:
+                        f.write(b"<model />")
+                    archive.close()
+
+                    archive = zipfile.ZipFile(file_path)
+                    for zip_info in archive.infolist():
+                        self.assertEqual(
+                            zip_info.compress_type,
+                            compress_type,
+                            f"At compression level {compression_level}, {zip_info.filename} must be written with "
+                            f"compression type {compress_type}.")
+                finally:
+                    if archive is not None:
+                        archive.close()
+                    if file_path is not None:
+                        os.remove(file_path)
+
     def test_create_archive_no_rights(self):
         """
         Tests opening an archive in a spot where there are no access rights.
@@ -157,13 +191,22 @@ class TestExport3MF(unittest.TestCase):
                 context.scene.unit_settings.length_unit = blender_unit
                 self.assertAlmostEqual(self.exporter.unit_scale(context), correct_conversions[blender_unit])
 
+    def test_allocate_resource_id(self):
+        """
+        Tests that the resource IDs are handed out in ascending order, starting at 1.
+        """
+        self.assertListEqual(
+            [self.exporter.allocate_resource_id() for i in range(5)],
+            [1, 2, 3, 4, 5],
+            "The resource IDs are counted upwards from 1.")
+
     def test_write_materials_empty(self):
         """
         Tests writing the materials for an empty list of objects.
 
         Try to not crash, please.
         """
-        resources_element = xml.etree.ElementTree.Element(f"{{{MODEL_NAMESPACE}}}resources")
+        resources_element = xml.etree.ElementTree.Element(MODEL_TAG_RESOURCES)
 
         result = self.exporter.write_materials(resources_element, [])
 
@@ -177,7 +220,7 @@ class TestExport3MF(unittest.TestCase):
         """
         Tests writing the materials for objects that have no materials.
         """
-        resources_element = xml.etree.ElementTree.Element(f"{{{MODEL_NAMESPACE}}}resources")
+        resources_element = xml.etree.ElementTree.Element(MODEL_TAG_RESOURCES)
         object1 = unittest.mock.MagicMock()
         object1.material_slots = []
         object2 = unittest.mock.MagicMock()
@@ -195,7 +238,7 @@ class TestExport3MF(unittest.TestCase):
         """
         Tests writing the name of a material.
         """
-        resources_element = xml.etree.ElementTree.Element(f"{{{MODEL_NAMESPACE}}}resources")
+        resources_element = xml.etree.ElementTree.Element(MODEL_TAG_RESOURCES)
         material_slot = unittest.mock.MagicMock()
         material_slot.material.name = "Navel lint"
         material_slot.material.diffuse_color = (0.8, 0.8, 0.8, 0.8)
@@ -207,7 +250,7 @@ class TestExport3MF(unittest.TestCase):
         base_elements = list(resources_element.iterfind("3mf:basematerials/3mf:base", MODEL_NAMESPACES))
         self.assertEqual(len(base_elements), 1, "There must be a <base> tag, since there is a material on this object.")
         base_element = base_elements[0]
-        self.assertEqual(base_element.attrib[f"{{{MODEL_NAMESPACE}}}name"], "Navel lint")
+        self.assertEqual(base_element.attrib[MODEL_ATTRIBUTE_NAME], "Navel lint")
         self.assertDictEqual(result, {"Navel lint": 0})
 
     def test_write_material_color(self):
@@ -231,7 +274,7 @@ class TestExport3MF(unittest.TestCase):
 
         for input, output in ground_truth.items():
             with self.subTest(input=input, output=output):
-                resources_element = xml.etree.ElementTree.Element(f"{{{MODEL_NAMESPACE}}}resources")
+                resources_element = xml.etree.ElementTree.Element(MODEL_TAG_RESOURCES)
                 material_slot = unittest.mock.MagicMock()
                 material_slot.material.name = "Programmable wood"
                 material_slot.material.diffuse_color = input
@@ -246,13 +289,13 @@ class TestExport3MF(unittest.TestCase):
                     1,
                     "There must be a <base> tag, since there is a material on this object.")
                 base_element = base_elements[0]
-                self.assertEqual(base_element.attrib[f"{{{MODEL_NAMESPACE}}}displaycolor"], output)
+                self.assertEqual(base_element.attrib[MODEL_ATTRIBUTE_DISPLAYCOLOR], output)
 
     def test_write_material_duplicate(self):
         """
         Test writing multiple objects that share the same material.
         """
-        resources_element = xml.etree.ElementTree.Element(f"{{{MODEL_NAMESPACE}}}resources")
+        resources_element = xml.etree.ElementTree.Element(MODEL_TAG_RESOURCES)
         material_slot = unittest.mock.MagicMock()
         material_slot.material.name = "Putty"
         material_slot.material.diffuse_color = (0.2, 0.4, 0.6, 1.0)
@@ -274,7 +317,7 @@ class TestExport3MF(unittest.TestCase):
         """
         Test writing an object with multiple materials and multiple objects with different materials.
         """
-        resources_element = xml.etree.ElementTree.Element(f"{{{MODEL_NAMESPACE}}}resources")
+        resources_element = xml.etree.ElementTree.Element(MODEL_TAG_RESOURCES)
         material1_slot = unittest.mock.MagicMock()
         material1_slot.material.name = "Aerogel"
         material1_slot.material.diffuse_color = (0.1, 0.2, 0.3, 0.4)
@@ -301,7 +344,7 @@ class TestExport3MF(unittest.TestCase):
         # Make sure that the indices are correct.
         for material_name, material_index in result.items():
             self.assertEqual(
-                base_elements[material_index].attrib[f"{{{MODEL_NAMESPACE}}}name"],
+                base_elements[material_index].attrib[MODEL_ATTRIBUTE_NAME],
                 material_name,
                 f"At index {material_index} in the order of the tags we should store material {material_name}, "
                 f"according to our mapping.")
@@ -310,8 +353,8 @@ class TestExport3MF(unittest.TestCase):
         """
         Tests writing objects when there are no objects in the scene.
         """
-        root = xml.etree.ElementTree.Element(f"{{{MODEL_NAMESPACE}}}model")
-        resources_element = xml.etree.ElementTree.SubElement(root, f"{{{MODEL_NAMESPACE}}}resources")
+        root = xml.etree.ElementTree.Element(MODEL_TAG_MODEL)
+        resources_element = xml.etree.ElementTree.SubElement(root, MODEL_TAG_RESOURCES)
         self.exporter.write_object_resource = unittest.mock.MagicMock()  # Record how this gets called.
         self.exporter.write_objects(root, resources_element, [], global_scale=1.0)  # Empty list of Blender objects.
 
@@ -330,8 +373,8 @@ class TestExport3MF(unittest.TestCase):
         """
         Tests writing a single object into the XML document.
         """
-        root = xml.etree.ElementTree.Element(f"{{{MODEL_NAMESPACE}}}model")
-        resources_element = xml.etree.ElementTree.SubElement(root, f"{{{MODEL_NAMESPACE}}}resources")
+        root = xml.etree.ElementTree.Element(MODEL_TAG_MODEL)
+        resources_element = xml.etree.ElementTree.SubElement(root, MODEL_TAG_RESOURCES)
         # Record how this gets called.
         self.exporter.write_object_resource = unittest.mock.MagicMock(return_value=(1, mathutils.Matrix.Identity(4)))
 
@@ -350,11 +393,11 @@ class TestExport3MF(unittest.TestCase):
         self.assertEqual(len(item_elements), 1, "There was one build item, building the only Blender object.")
         item_element = item_elements[0]
         self.assertEqual(
-            item_element.attrib[f"{{{MODEL_NAMESPACE}}}objectid"],
+            item_element.attrib[MODEL_ATTRIBUTE_OBJECTID],
             "1",
             "The object ID must be equal to what the write_object_resource function returned.")
         self.assertNotIn(
-            f"{{{MODEL_NAMESPACE}}}transform",
+            MODEL_ATTRIBUTE_TRANSFORM,
             item_element.attrib,
             "There should not be a transformation since the transformation returned by write_object_resource was "
             "Identity.")
@@ -363,8 +406,8 @@ class TestExport3MF(unittest.TestCase):
         """
         Tests writing one object contained inside another.
         """
-        root = xml.etree.ElementTree.Element(f"{{{MODEL_NAMESPACE}}}model")
-        resources_element = xml.etree.ElementTree.SubElement(root, f"{{{MODEL_NAMESPACE}}}resources")
+        root = xml.etree.ElementTree.Element(MODEL_TAG_MODEL)
+        resources_element = xml.etree.ElementTree.SubElement(root, MODEL_TAG_RESOURCES)
         # Record how this gets called.
         self.exporter.write_object_resource = unittest.mock.MagicMock(return_value=(1, mathutils.Matrix.Identity(4)))
 
@@ -390,8 +433,8 @@ class TestExport3MF(unittest.TestCase):
         """
         Tests that Blender objects with different types get ignored.
         """
-        root = xml.etree.ElementTree.Element(f"{{{MODEL_NAMESPACE}}}model")
-        resources_element = xml.etree.ElementTree.SubElement(root, f"{{{MODEL_NAMESPACE}}}resources")
+        root = xml.etree.ElementTree.Element(MODEL_TAG_MODEL)
+        resources_element = xml.etree.ElementTree.SubElement(root, MODEL_TAG_RESOURCES)
         # Record whether this gets called.
         self.exporter.write_object_resource = unittest.mock.MagicMock(return_value=(1, mathutils.Matrix.Identity(4)))
 
@@ -414,8 +457,8 @@ class TestExport3MF(unittest.TestCase):
         """
         Tests writing two objects.
         """
-        root = xml.etree.ElementTree.Element(f"{{{MODEL_NAMESPACE}}}model")
-        resources_element = xml.etree.ElementTree.SubElement(root, f"{{{MODEL_NAMESPACE}}}resources")
+        root = xml.etree.ElementTree.Element(MODEL_TAG_MODEL)
+        resources_element = xml.etree.ElementTree.SubElement(root, MODEL_TAG_RESOURCES)
         self.exporter.write_object_resource = unittest.mock.MagicMock(side_effect=[
             (1, mathutils.Matrix.Identity(4)),
             (2, mathutils.Matrix.Identity(4))
@@ -446,8 +489,8 @@ class TestExport3MF(unittest.TestCase):
 
         This tests both the global scale as well as a scale applied to the object itself.
         """
-        root = xml.etree.ElementTree.Element(f"{{{MODEL_NAMESPACE}}}model")
-        resources_element = xml.etree.ElementTree.SubElement(root, f"{{{MODEL_NAMESPACE}}}resources")
+        root = xml.etree.ElementTree.Element(MODEL_TAG_MODEL)
+        resources_element = xml.etree.ElementTree.SubElement(root, MODEL_TAG_RESOURCES)
         self.exporter.format_transformation = lambda x: str(x)  # The transformation formatter is not being tested here.
 
         # The object itself is moved.
@@ -468,7 +511,7 @@ class TestExport3MF(unittest.TestCase):
         self.assertEqual(len(item_elements), 1, "There was only one object to build.")
         item_element = item_elements[0]
         self.assertEqual(
-            item_element.attrib[f"{{{MODEL_NAMESPACE}}}transform"],
+            item_element.attrib[MODEL_ATTRIBUTE_TRANSFORM],
             str(expected_transformation),
             "The transformation must be equal to the expected transformation.")
 
@@ -476,8 +519,8 @@ class TestExport3MF(unittest.TestCase):
         """
         Tests writing build items with metadata.
         """
-        root = xml.etree.ElementTree.Element(f"{{{MODEL_NAMESPACE}}}model")
-        resources_element = xml.etree.ElementTree.SubElement(root, f"{{{MODEL_NAMESPACE}}}resources")
+        root = xml.etree.ElementTree.Element(MODEL_TAG_MODEL)
+        resources_element = xml.etree.ElementTree.SubElement(root, MODEL_TAG_RESOURCES)
         # Not interested in testing this code here.
         self.exporter.write_object_resource = unittest.mock.MagicMock(return_value=(1, mathutils.Matrix.Identity(4)))
 
@@ -500,18 +543,18 @@ class TestExport3MF(unittest.TestCase):
         metadatagroup_element = metadatagroup_elements[0]
         metadata_elements = metadatagroup_element.findall("3mf:metadata", namespaces=MODEL_NAMESPACES)
         for metadata_element in metadata_elements:
-            if metadata_element.attrib[f"{{{MODEL_NAMESPACE}}}name"] == "Title":
+            if metadata_element.attrib[MODEL_ATTRIBUTE_NAME] == "Title":
                 self.assertEqual(
                     metadata_element.text,
                     "Acoustic Kitty",
                     "The name of the object was 'Acoustic Kitty', "
                     "which should get stored as the 'Title' metadata entry.")
                 self.assertEqual(
-                    metadata_element.attrib[f"{{{MODEL_NAMESPACE}}}type"],
+                    metadata_element.attrib[MODEL_ATTRIBUTE_TYPE],
                     "xs:string",
                     "The object name is always a string.")
                 self.assertEqual(
-                    metadata_element.attrib[f"{{{MODEL_NAMESPACE}}}preserve"],
+                    metadata_element.attrib[MODEL_ATTRIBUTE_PRESERVE],
                     "1",
                     "The object name must always be preserved (the way that we write these files).")
             elif metadata_element.attrib["name"] == "Description":
@@ -520,11 +563,11 @@ class TestExport3MF(unittest.TestCase):
                     "A CIA project to spy on the Soviet embassies.",
                     "This is the 'Description' metadata value.")
                 self.assertEqual(
-                    metadata_element.attrib[f"{{{MODEL_NAMESPACE}}}type"],
+                    metadata_element.attrib[MODEL_ATTRIBUTE_TYPE],
                     "mostly fur",
                     "The data type was set to 'mostly fur'.")
                 self.assertNotIn(
-                    f"{{{MODEL_NAMESPACE}}}preserve",
+                    MODEL_ATTRIBUTE_PRESERVE,
                     metadata_element.attrib,
                     "Since this metadata isn't preserved, "
                     "don't write a 'preserve' attribute but let it be the default, which is to not preserve.")
@@ -532,6 +575,45 @@ class TestExport3MF(unittest.TestCase):
                 self.assertFalse("We only had 'Title' and 'Description' metadata, not {name}".format(
                     name=metadata_element.attrib["name"]))
 
+    def test_write_objects_stream(self):
+        """
+        Tests streaming the resources of the objects to a stream as soon as they are complete.
+        """
+        root = xml.etree.ElementTree.Element(MODEL_TAG_MODEL)
+        resources_element = xml.etree.ElementTree.Element(MODEL_TAG_RESOURCES)
+        stream = io.BytesIO()
+        objects_in_memory = []  # How many object resources were in memory when writing each object.
+
+        def write_object_resource(resources_element, blender_object):
+            objects_in_memory.append(len(resources_element))
+            resource_id = len(objects_in_memory)
+            xml.etree.ElementTree.SubElement(resources_element, MODEL_TAG_OBJECT, attrib={
+                MODEL_ATTRIBUTE_ID: str(resource_id)
+            })
+            return resource_id, mathutils.Matrix.Identity(4)
+        self.exporter.write_object_resource = write_object_resource
+
+        object1 = unittest.mock.MagicMock()
+        object1.parent = None
+        object1.type = 'MESH'
+        object2 = unittest.mock.MagicMock()
+        object2.parent = None
+        object2.type = 'MESH'
+
+        self.exporter.write_objects(root, resources_element, [object1, object2], 1.0, model_stream=stream)
+
+        self.assertListEqual(objects_in_memory, [0, 0], "The first object must be written out before the second.")
+        self.assertEqual(len(resources_element), 0, "All resources were written to the stream.")
+        streamed = xml.etree.ElementTree.fromstring(
+            f"<streamed xmlns=\"{MODEL_NAMESPACE}\">".encode("UTF-8") + stream.getvalue() + b"</streamed>")
+        object_elements = streamed.findall("3mf:object", namespaces=MODEL_NAMESPACES)
+        self.assertListEqual(
+            [object_element.attrib["id"] for object_element in object_elements],
+            ["1", "2"],
+            "Both objects must be written to the stream, in order.")
+        item_elements = list(root.iterfind("3mf:build/3mf:item", MODEL_NAMESPACES))
+        self.assertEqual(len(item_elements), 2, "The build items are still kept in the document.")
+
     def test_write_object_resource_id(self):
         """
         Ensures that the resource IDs given to the resources are unique positive integers.
@@ -539,7 +621,7 @@ class TestExport3MF(unittest.TestCase):
         The IDs are probably just ascending numbers, but we only need to test that they are positive integers that were
         not used before.
         """
-        resources_element = xml.etree.ElementTree.Element(f"{{{MODEL_NAMESPACE}}}resources")
+        resources_element = xml.etree.ElementTree.Element(MODEL_TAG_RESOURCES)
         blender_object = unittest.mock.MagicMock()
 
         given_ids = set()
@@ -557,7 +639,7 @@ class TestExport3MF(unittest.TestCase):
 
         It should become an empty <object> element then.
         """
-        resources_element = xml.etree.ElementTree.Element(f"{{{MODEL_NAMESPACE}}}resources")
+        resources_element = xml.etree.ElementTree.Element(MODEL_TAG_RESOURCES)
         blender_object = unittest.mock.MagicMock()
 
         blender_object.to_mesh.return_value = None  # Indicates that there is no Mesh in this object.
@@ -575,7 +657,7 @@ class TestExport3MF(unittest.TestCase):
         """
         Tests writing the mesh of an object resource.
         """
-        resources_element = xml.etree.ElementTree.Element(f"{{{MODEL_NAMESPACE}}}resources")
+        resources_element = xml.etree.ElementTree.Element(MODEL_TAG_RESOURCES)
         blender_object = unittest.mock.MagicMock()
         mock_material = unittest.mock.MagicMock()
         mock_material.name = "Mock Material"
@@ -603,11 +685,32 @@ class TestExport3MF(unittest.TestCase):
             0,
             blender_object.material_slots)
 
+    def test_write_object_resource_mesh_cleared(self):
+        """
+        Tests that the temporary mesh of an object is released after writing it, even if writing fails.
+        """
+        resources_element = xml.etree.ElementTree.Element(MODEL_TAG_RESOURCES)
+        blender_object = unittest.mock.MagicMock()
+        blender_object.material_slots = []
+        blender_object.to_mesh().vertices = [(1, 2, 3)]
+        blender_object.to_mesh().loop_triangles = []
+        self.exporter.write_vertices = unittest.mock.MagicMock()
+        self.exporter.write_triangles = unittest.mock.MagicMock()
+
+        self.exporter.write_object_resource(resources_element, blender_object)
+        blender_object.to_mesh_clear.assert_called_once_with()
+
+        blender_object.to_mesh_clear.reset_mock()
+        self.exporter.write_vertices.side_effect = MemoryError  # Something goes wrong halfway.
+        with self.assertRaises(MemoryError):
+            self.exporter.write_object_resource(resources_element, blender_object)
+        blender_object.to_mesh_clear.assert_called_once_with()
+
     def test_write_object_resource_children(self):
         """
         Tests writing an object resource that has children.
         """
-        resources_element = xml.etree.ElementTree.Element(f"{{{MODEL_NAMESPACE}}}resources")
+        resources_element = xml.etree.ElementTree.Element(MODEL_TAG_RESOURCES)
         blender_object = unittest.mock.MagicMock()
         blender_object.matrix_world = mathutils.Matrix.Identity(4)
 
@@ -626,11 +729,11 @@ class TestExport3MF(unittest.TestCase):
         self.assertEqual(len(component_elements), 1, "There was 1 child, so there should be 1 component.")
         component_element = component_elements[0]
         self.assertNotEqual(
-            int(component_element.attrib[f"{{{MODEL_NAMESPACE}}}objectid"]),
+            int(component_element.attrib[MODEL_ATTRIBUTE_OBJECTID]),
             int(parent_id),
             "The ID given to the child object must be unique.")
         self.assertEqual(
-            component_element.attrib[f"{{{MODEL_NAMESPACE}}}transform"],
+            component_element.attrib[MODEL_ATTRIBUTE_TRANSFORM],
             "2 0 0 0 2 0 0 0 2 0 0 0",
             "The transformation for 200% scale must be given to this component.")
 
@@ -644,7 +747,7 @@ class TestExport3MF(unittest.TestCase):
         self.exporter.write_vertices = unittest.mock.MagicMock()
         self.exporter.write_triangles = unittest.mock.MagicMock()
 
-        resources_element = xml.etree.ElementTree.Element(f"{{{MODEL_NAMESPACE}}}resources")
+        resources_element = xml.etree.ElementTree.Element(MODEL_TAG_RESOURCES)
         blender_object = unittest.mock.MagicMock()
         blender_object.matrix_world = mathutils.Matrix.Identity(4)
         mock_material = unittest.mock.MagicMock()
@@ -676,7 +779,7 @@ class TestExport3MF(unittest.TestCase):
             "There is 1 child component, and 1 new component created for the mesh in the parent object.")
         used_ids = {parent_id}
         for component_element in component_elements:
-            child_id = int(component_element.attrib[f"{{{MODEL_NAMESPACE}}}objectid"])
+            child_id = int(component_element.attrib[MODEL_ATTRIBUTE_OBJECTID])
             self.assertNotIn(child_id, used_ids, "The ID given to the components must be unique.")
             used_ids.add(child_id)
         mesh_elements = resources_element.findall("3mf:object/3mf:mesh", namespaces=MODEL_NAMESPACES)
@@ -701,7 +804,7 @@ class TestExport3MF(unittest.TestCase):
         self.exporter.write_vertices = unittest.mock.MagicMock()
         self.exporter.write_triangles = unittest.mock.MagicMock()
 
-        resources_element = xml.etree.ElementTree.Element(f"{{{MODEL_NAMESPACE}}}resources")
+        resources_element = xml.etree.ElementTree.Element(MODEL_TAG_RESOURCES)
         blender_object = unittest.mock.MagicMock()
         blender_object.matrix_world = mathutils.Matrix.Identity(4)
         mock_material = unittest.mock.MagicMock()
@@ -737,18 +840,18 @@ class TestExport3MF(unittest.TestCase):
             "3mf:metadata",
             namespaces=MODEL_NAMESPACES)
         for metadata_element in metadata_elements:
-            if metadata_element.attrib[f"{{{MODEL_NAMESPACE}}}name"] == "Title":
+            if metadata_element.attrib[MODEL_ATTRIBUTE_NAME] == "Title":
                 self.assertEqual(
                     metadata_element.text,
                     "Sergeant Reckless",
                     "The name of the mesh was 'Sergeant Reckless', "
                     "which should get stored as the 'Title' metadata entry.")
                 self.assertEqual(
-                    metadata_element.attrib[f"{{{MODEL_NAMESPACE}}}type"],
+                    metadata_element.attrib[MODEL_ATTRIBUTE_TYPE],
                     "xs:string",
                     "The object name is always a string.")
                 self.assertEqual(
-                    metadata_element.attrib[f"{{{MODEL_NAMESPACE}}}preserve"],
+                    metadata_element.attrib[MODEL_ATTRIBUTE_PRESERVE],
                     "1",
                     "The object name must always be preserved (the way that we write these files).")
             elif metadata_element.attrib["name"] == "Description":
@@ -757,11 +860,11 @@ class TestExport3MF(unittest.TestCase):
                     "Pack horse",
                     "This is the 'Description' metadata, which was set to 'Pack horse'.")
                 self.assertEqual(
-                    metadata_element.attrib[f"{{{MODEL_NAMESPACE}}}type"],
+                    metadata_element.attrib[MODEL_ATTRIBUTE_TYPE],
                     "some_type",
                     "The data type was set to 'some_type'.")
                 self.assertNotIn(
-                    f"{{{MODEL_NAMESPACE}}}preserve",
+                    MODEL_ATTRIBUTE_PRESERVE,
                     metadata_element.attrib,
                     "Since this metadata isn't preserved, don't write a 'preserve' attribute "
                     "but let it be the default, which is to not preserve.")
@@ -778,7 +881,7 @@ class TestExport3MF(unittest.TestCase):
         self.exporter.write_triangles = unittest.mock.MagicMock()
         self.exporter.material_resource_id = "999"  # Simulate having written a material.
 
-        resources_element = xml.etree.ElementTree.Element(f"{{{MODEL_NAMESPACE}}}resources")
+        resources_element = xml.etree.ElementTree.Element(MODEL_TAG_RESOURCES)
         blender_object = unittest.mock.MagicMock()
         blender_object.matrix_world = mathutils.Matrix.Identity(4)
         blender_object.children = []
@@ -799,11 +902,11 @@ class TestExport3MF(unittest.TestCase):
         self.assertEqual(len(object_elements), 1, "We have written only one object.")
         object_element = object_elements[0]
         self.assertEqual(
-            object_element.attrib[f"{{{MODEL_NAMESPACE}}}pid"],
+            object_element.attrib[MODEL_ATTRIBUTE_PID],
             "999",
             "We simulated having written a material with ID 999.")
         self.assertEqual(
-            object_element.attrib[f"{{{MODEL_NAMESPACE}}}pindex"],
+            object_element.attrib[MODEL_ATTRIBUTE_PINDEX],
             "0",
             "There is only one material, and it's the most common one: index 0.")
 
@@ -816,7 +919,7 @@ class TestExport3MF(unittest.TestCase):
         self.exporter.write_vertices = unittest.mock.MagicMock()
         self.exporter.material_resource_id = "999"  # Simulate having written a material.
 
-        resources_element = xml.etree.ElementTree.Element(f"{{{MODEL_NAMESPACE}}}resources")
+        resources_element = xml.etree.ElementTree.Element(MODEL_TAG_RESOURCES)
         blender_object = unittest.mock.MagicMock()
         blender_object.matrix_world = mathutils.Matrix.Identity(4)
         blender_object.children = []
@@ -847,32 +950,127 @@ class TestExport3MF(unittest.TestCase):
         self.assertEqual(len(object_elements), 1, "We have written only one object.")
         object_element = object_elements[0]
         self.assertEqual(
-            object_element.attrib[f"{{{MODEL_NAMESPACE}}}pid"],
+            object_element.attrib[MODEL_ATTRIBUTE_PID],
             "999",
             "We simulated having written a material with ID 999.")
         self.assertEqual(
-            object_element.attrib[f"{{{MODEL_NAMESPACE}}}pindex"],
+            object_element.attrib[MODEL_ATTRIBUTE_PINDEX],
             "1",
             "Material with index 1 was the most common one for this object.")
         triangles = resources_element.findall(
             "3mf:object/3mf:mesh/3mf:triangles/3mf:triangle",
             namespaces=MODEL_NAMESPACES)
         self.assertNotIn(
-            f"{{{MODEL_NAMESPACE}}}p1",
+            MODEL_ATTRIBUTE_P1,
             triangles[0].attrib,
             "The first triangle had the index of the most common material, "
             "so it shouldn't override the material index.")
         self.assertNotIn(
-            f"{{{MODEL_NAMESPACE}}}p1",
+            MODEL_ATTRIBUTE_P1,
             triangles[2].attrib,
             "The third triangle had the index of the most common material, "
             "so it shouldn't override the material index.")
         self.assertEqual(
-            triangles[1].attrib[f"{{{MODEL_NAMESPACE}}}p1"],
+            triangles[1].attrib[MODEL_ATTRIBUTE_P1],
             "0",
             "This triangle had material index 0, which is not the most common material, "
             "so it must override the material index to 0.")
 
+    def test_flush_children(self):
+        """
+        Tests writing the children of an element to a stream.
+        """
+        resources_element = xml.etree.ElementTree.Element(MODEL_TAG_RESOURCES)
+        for resource_id in ("1", "2"):
+            object_element = xml.etree.ElementTree.SubElement(
+                resources_element,
+                MODEL_TAG_OBJECT, attrib={
+                    MODEL_ATTRIBUTE_ID: resource_id
+                })
+            xml.etree.ElementTree.SubElement(object_element, MODEL_TAG_MESH)
+        stream = io.BytesIO()
+
+        self.exporter.flush_children(stream, resources_element)
+
+        self.assertEqual(len(resources_element), 0, "The children are removed from the element once they're written.")
+        streamed = xml.etree.ElementTree.fromstring(
+            f"<streamed xmlns=\"{MODEL_NAMESPACE}\">".encode("UTF-8") + stream.getvalue() + b"</streamed>")
+        object_elements = streamed.findall("3mf:object", namespaces=MODEL_NAMESPACES)
+        self.assertEqual(len(object_elements), 2, "Both children must be written.")
+        self.assertEqual(object_elements[0].attrib["id"], "1", "The attributes are written without namespace prefix.")
+        self.assertEqual(object_elements[1].attrib["id"], "2")
+        self.assertEqual(
+            len(streamed.findall("3mf:object/3mf:mesh", namespaces=MODEL_NAMESPACES)),
+            2,
+            "The grandchildren must be written along with the children.")
+
+    def test_write_element_escape(self):
+        """
+        Tests whether text and attribute values get escaped when writing elements.
+        """
+        metadata_element = xml.etree.ElementTree.Element(MODEL_TAG_METADATA, attrib={
+            MODEL_ATTRIBUTE_NAME: "Quote \"me\" & <you>"
+        })
+        metadata_element.text = "<Tom & Jerry>"
+        stream = io.BytesIO()
+
+        self.exporter.write_element(stream, metadata_element)
+
+        parsed = xml.etree.ElementTree.fromstring(stream.getvalue())
+        self.assertEqual(parsed.tag, "metadata", "The namespace is not written with the tag.")
+        self.assertEqual(parsed.attrib["name"], "Quote \"me\" & <you>", "The attribute must survive escaping.")
+        self.assertEqual(parsed.text, "<Tom & Jerry>", "The text must survive escaping.")
+
+    def test_write_element_empty(self):
+        """
+        Tests writing elements without children or text.
+        """
+        stream = io.BytesIO()
+        self.exporter.write_element(stream, xml.etree.ElementTree.Element(MODEL_TAG_BUILD))
+        self.assertEqual(stream.getvalue(), b"<build/>", "Empty elements are written as self-closing tags.")
+
+    def test_write_element_mesh(self):
+        """
+        Tests writing the vertices and triangles of a mesh.
+        """
+        self.exporter.material_name_to_index["PLA"] = 0
+        self.exporter.material_name_to_index["PLB"] = 1
+        material_slots = [
+            unittest.mock.MagicMock(material=unittest.mock.MagicMock()),
+            unittest.mock.MagicMock(material=unittest.mock.MagicMock())
+        ]
+        material_slots[0].material.name = "PLA"
+        material_slots[1].material.name = "PLB"
+        mesh_element = xml.etree.ElementTree.Element(MODEL_TAG_MESH)
+        self.exporter.write_vertices(mesh_element, [
+            MockVertex(co=(0.0, 1.1, 2.2)),
+            MockVertex(co=(3.3, 4.4, 5.5)),
+            MockVertex(co=(6.6, 7.7, 8.8))
+        ])
+        self.exporter.write_triangles(mesh_element, [
+            MockLoopTriangle(vertices=[0, 1, 2], material_index=0),
+            MockLoopTriangle(vertices=[2, 1, 0], material_index=1)
+        ], 0, material_slots)
+        stream = io.BytesIO()
+
+        self.exporter.write_element(stream, mesh_element)
+
+        parsed = xml.etree.ElementTree.fromstring(stream.getvalue())
+        vertex_elements = parsed.findall("vertices/vertex")
+        self.assertListEqual(
+            [(vertex.attrib["x"], vertex.attrib["y"], vertex.attrib["z"]) for vertex in vertex_elements],
+            [("0", "1.1", "2.2"), ("3.3", "4.4", "5.5"), ("6.6", "7.7", "8.8")],
+            "All vertices must be written with their coordinates.")
+        triangle_elements = parsed.findall("triangles/triangle")
+        self.assertDictEqual(
+            triangle_elements[0].attrib,
+            {"v1": "0", "v2": "1", "v3": "2"},
+            "The first triangle has the material of the object, so it doesn't specify a material.")
+        self.assertDictEqual(
+            triangle_elements[1].attrib,
+            {"v1": "2", "v2": "1", "v3": "0", "p1": "1"},
+            "The second triangle overrides the material of the object.")
+
     def test_format_transformation_identity(self):
         """
         Tests formatting the identity matrix.
@@ -892,6 +1090,16 @@ class TestExport3MF(unittest.TestCase):
             (3.0, 3.1, 3.2, 3.3)))
         self.assertEqual(self.exporter.format_transformation(matrix), "0 1 2 0.1 1.1 2.1 0.2 1.2 2.2 0.3 1.3 2.3")
 
+    def test_format_transformation_scientific(self):
+        """
+        Tests formatting a matrix with very large and very small numbers, which must not use scientific notation.
+        """
+        matrix = mathutils.Matrix.Scale(12345678.0, 4)
+        matrix[0][3] = 0.0000001  # Too small to be written with 6 decimals.
+        self.assertEqual(
+            self.exporter.format_transformation(matrix),
+            "12345678 0 0 0 12345678 0 0 0 12345678 0 0 0")
+
     def test_write_vertices_empty(self):
         """
         Tests writing vertices when there are no vertices.
@@ -900,7 +1108,7 @@ class TestExport3MF(unittest.TestCase):
         will not even be a <mesh> element then. We merely test this for defensive coding. The function should be
         reliable as a stand-alone routine regardless of input.
         """
-        mesh_element = xml.etree.ElementTree.Element(f"{{{MODEL_NAMESPACE}}}mesh")
+        mesh_element = xml.etree.ElementTree.Element(MODEL_TAG_MESH)
         vertices = []
 
         self.exporter.write_vertices(mesh_element, vertices)
@@ -914,12 +1122,12 @@ class TestExport3MF(unittest.TestCase):
         """
         Tests writing several vertices to the 3MF document.
         """
-        mesh_element = xml.etree.ElementTree.Element(f"{{{MODEL_NAMESPACE}}}mesh")
+        mesh_element = xml.etree.ElementTree.Element(MODEL_TAG_MESH)
         # The vertices this function accepts are Blender's implementation, where the coordinates are in the "co"
         # property.
-        vertex1 = unittest.mock.MagicMock(co=(0.0, 1.1, 2.2))
-        vertex2 = unittest.mock.MagicMock(co=(3.3, 4.4, 5.5))
-        vertex3 = unittest.mock.MagicMock(co=(6.6, 7.7, 8.8))
+        vertex1 = MockVertex(co=(0.0, 1.1, 2.2))
+        vertex2 = MockVertex(co=(3.3, 4.4, 5.5))
+        vertex3 = MockVertex(co=(6.6, 7.7, 8.8))
         vertices = [vertex1, vertex2, vertex3]
 
         self.exporter.write_vertices(mesh_element, vertices)
@@ -927,20 +1135,39 @@ class TestExport3MF(unittest.TestCase):
         vertex_elements = mesh_element.findall("3mf:vertices/3mf:vertex", namespaces=MODEL_NAMESPACES)
         self.assertEqual(len(vertex_elements), 3, "There were 3 vertices to write.")
         self.assertEqual(
-            vertex_elements[0].attrib[f"{{{MODEL_NAMESPACE}}}x"],
+            vertex_elements[0].attrib[MODEL_ATTRIBUTE_X],
             "0",
             "Formatting must format as integers if possible.")
         self.assertEqual(
-            vertex_elements[0].attrib[f"{{{MODEL_NAMESPACE}}}y"],
+            vertex_elements[0].attrib[MODEL_ATTRIBUTE_Y],
             "1.1",
             "Formatting must format as floats if necessary.")
-        self.assertEqual(vertex_elements[0].attrib[f"{{{MODEL_NAMESPACE}}}z"], "2.2")
-        self.assertEqual(vertex_elements[1].attrib[f"{{{MODEL_NAMESPACE}}}x"], "3.3")
-        self.assertEqual(vertex_elements[1].attrib[f"{{{MODEL_NAMESPACE}}}y"], "4.4")
-        self.assertEqual(vertex_elements[1].attrib[f"{{{MODEL_NAMESPACE}}}z"], "5.5")
-        self.assertEqual(vertex_elements[2].attrib[f"{{{MODEL_NAMESPACE}}}x"], "6.6")
-        self.assertEqual(vertex_elements[2].attrib[f"{{{MODEL_NAMESPACE}}}y"], "7.7")
-        self.assertEqual(vertex_elements[2].attrib[f"{{{MODEL_NAMESPACE}}}z"], "8.8")
+        self.assertEqual(vertex_elements[0].attrib[MODEL_ATTRIBUTE_Z], "2.2")
+        self.assertEqual(vertex_elements[1].attrib[MODEL_ATTRIBUTE_X], "3.3")
+        self.assertEqual(vertex_elements[1].attrib[MODEL_ATTRIBUTE_Y], "4.4")
+        self.assertEqual(vertex_elements[1].attrib[MODEL_ATTRIBUTE_Z], "5.5")
+        self.assertEqual(vertex_elements[2].attrib[MODEL_ATTRIBUTE_X], "6.6")
+        self.assertEqual(vertex_elements[2].attrib[MODEL_ATTRIBUTE_Y], "7.7")
+        self.assertEqual(vertex_elements[2].attrib[MODEL_ATTRIBUTE_Z], "8.8")
+
+    def test_write_vertices_collection(self):
+        """
+        Tests writing vertices from a Blender collection, which provides all coordinates at once.
+        """
+        mesh_element = xml.etree.ElementTree.Element(MODEL_TAG_MESH)
+        vertices = MockCollection([
+            MockVertex(co=(0.0, 1.1, 2.2)),
+            MockVertex(co=(-3.3, 4.4, 5.5))
+        ])
+
+        self.exporter.write_vertices(mesh_element, vertices)
+
+        vertex_elements = mesh_element.findall("3mf:vertices/3mf:vertex", namespaces=MODEL_NAMESPACES)
+        self.assertListEqual(
+            [(vertex.attrib[MODEL_ATTRIBUTE_X], vertex.attrib[MODEL_ATTRIBUTE_Y], vertex.attrib[MODEL_ATTRIBUTE_Z])
+             for vertex in vertex_elements],
+            [("0", "1.1", "2.2"), ("-3.3", "4.4", "5.5")],
+            "The coordinates are formatted the same as when they are read from each vertex.")
 
     def test_write_triangles_empty(self):
         """
@@ -949,7 +1176,7 @@ class TestExport3MF(unittest.TestCase):
         Contrary to the similar test for writing vertices, this may actually happen in the field, if a mesh consists of
         only vertices or edges.
         """
-        mesh_element = xml.etree.ElementTree.Element(f"{{{MODEL_NAMESPACE}}}mesh")
+        mesh_element = xml.etree.ElementTree.Element(MODEL_TAG_MESH)
         triangles = []
 
         self.exporter.write_triangles(mesh_element, triangles, 0, [])
@@ -963,10 +1190,10 @@ class TestExport3MF(unittest.TestCase):
         """
         Tests writing several triangles to the 3MF document.
         """
-        mesh_element = xml.etree.ElementTree.Element(f"{{{MODEL_NAMESPACE}}}mesh")
-        triangle1 = unittest.mock.MagicMock(vertices=[0, 1, 2], material_index=0)
-        triangle2 = unittest.mock.MagicMock(vertices=[3, 4, 5], material_index=0)
-        triangle3 = unittest.mock.MagicMock(vertices=[4, 2, 0], material_index=0)
+        mesh_element = xml.etree.ElementTree.Element(MODEL_TAG_MESH)
+        triangle1 = MockLoopTriangle(vertices=[0, 1, 2], material_index=0)
+        triangle2 = MockLoopTriangle(vertices=[3, 4, 5], material_index=0)
+        triangle3 = MockLoopTriangle(vertices=[4, 2, 0], material_index=0)
         triangles = [triangle1, triangle2, triangle3]
         self.exporter.material_name_to_index["BLA"] = 0
         material_mock = unittest.mock.MagicMock()
@@ -977,15 +1204,64 @@ class TestExport3MF(unittest.TestCase):
 
         triangle_elements = mesh_element.findall("3mf:triangles/3mf:triangle", namespaces=MODEL_NAMESPACES)
         self.assertEqual(len(triangle_elements), 3, "There were 3 triangles to write.")
-        self.assertEqual(triangle_elements[0].attrib[f"{{{MODEL_NAMESPACE}}}v1"], "0")
-        self.assertEqual(triangle_elements[0].attrib[f"{{{MODEL_NAMESPACE}}}v2"], "1")
-        self.assertEqual(triangle_elements[0].attrib[f"{{{MODEL_NAMESPACE}}}v3"], "2")
-        self.assertEqual(triangle_elements[1].attrib[f"{{{MODEL_NAMESPACE}}}v1"], "3")
-        self.assertEqual(triangle_elements[1].attrib[f"{{{MODEL_NAMESPACE}}}v2"], "4")
-        self.assertEqual(triangle_elements[1].attrib[f"{{{MODEL_NAMESPACE}}}v3"], "5")
-        self.assertEqual(triangle_elements[2].attrib[f"{{{MODEL_NAMESPACE}}}v1"], "4")
-        self.assertEqual(triangle_elements[2].attrib[f"{{{MODEL_NAMESPACE}}}v2"], "2")
-        self.assertEqual(triangle_elements[2].attrib[f"{{{MODEL_NAMESPACE}}}v3"], "0")
+        self.assertEqual(triangle_elements[0].attrib[MODEL_ATTRIBUTE_V1], "0")
+        self.assertEqual(triangle_elements[0].attrib[MODEL_ATTRIBUTE_V2], "1")
+        self.assertEqual(triangle_elements[0].attrib[MODEL_ATTRIBUTE_V3], "2")
+        self.assertEqual(triangle_elements[1].attrib[MODEL_ATTRIBUTE_V1], "3")
+        self.assertEqual(triangle_elements[1].attrib[MODEL_ATTRIBUTE_V2], "4")
+        self.assertEqual(triangle_elements[1].attrib[MODEL_ATTRIBUTE_V3], "5")
+        self.assertEqual(triangle_elements[2].attrib[MODEL_ATTRIBUTE_V1], "4")
+        self.assertEqual(triangle_elements[2].attrib[MODEL_ATTRIBUTE_V2], "2")
+        self.assertEqual(triangle_elements[2].attrib[MODEL_ATTRIBUTE_V3], "0")
+
+    def test_write_triangles_materials(self):
+        """
+        Tests writing triangles that have a different material than the object they belong to.
+        """
+        mesh_element = xml.etree.ElementTree.Element(MODEL_TAG_MESH)
+        triangle1 = MockLoopTriangle(vertices=[0, 1, 2], material_index=0)
+        triangle2 = MockLoopTriangle(vertices=[3, 4, 5], material_index=1)
+        triangle3 = MockLoopTriangle(vertices=[4, 2, 0], material_index=2)  # Refers to a non-existent slot.
+        triangles = [triangle1, triangle2, triangle3]
+        # The global list of materials is in a different order than the slots of this object.
+        self.exporter.material_name_to_index["PLA"] = 1
+        self.exporter.material_name_to_index["PLB"] = 0
+        material_slots = [unittest.mock.MagicMock(), unittest.mock.MagicMock()]
+        material_slots[0].material.name = "PLA"
+        material_slots[1].material.name = "PLB"
+
+        self.exporter.write_triangles(mesh_element, triangles, 1, material_slots)
+
+        triangle_elements = mesh_element.findall("3mf:triangles/3mf:triangle", namespaces=MODEL_NAMESPACES)
+        self.assertNotIn(MODEL_ATTRIBUTE_P1, triangle_elements[0].attrib, "Same material as the object.")
+        self.assertEqual(triangle_elements[1].attrib[MODEL_ATTRIBUTE_P1], "0", "PLB is at index 0.")
+        self.assertNotIn(MODEL_ATTRIBUTE_P1, triangle_elements[2].attrib, "The slot doesn't exist.")
+
+    def test_write_triangles_collection(self):
+        """
+        Tests writing triangles from a Blender collection, which provides all indices at once.
+        """
+        mesh_element = xml.etree.ElementTree.Element(MODEL_TAG_MESH)
+        triangles = MockCollection([
+            MockLoopTriangle(vertices=(0, 1, 2), material_index=0),
+            MockLoopTriangle(vertices=(3, 4, 5), material_index=1)
+        ])
+        self.exporter.material_name_to_index["PLA"] = 0
+        self.exporter.material_name_to_index["PLB"] = 1
+        material_slots = [unittest.mock.MagicMock(), unittest.mock.MagicMock()]
+        material_slots[0].material.name = "PLA"
+        material_slots[1].material.name = "PLB"
+
+        self.exporter.write_triangles(mesh_element, triangles, 0, material_slots)
+
+        triangle_elements = mesh_element.findall("3mf:triangles/3mf:triangle", namespaces=MODEL_NAMESPACES)
+        self.assertListEqual(
+            [dict(triangle.attrib) for triangle in triangle_elements],
+            [
+                {MODEL_ATTRIBUTE_V1: "0", MODEL_ATTRIBUTE_V2: "1", MODEL_ATTRIBUTE_V3: "2"},
+                {MODEL_ATTRIBUTE_V1: "3", MODEL_ATTRIBUTE_V2: "4", MODEL_ATTRIBUTE_V3: "5", MODEL_ATTRIBUTE_P1: "1"}
+            ],
+            "The second triangle has a different material than the object, so it needs to override it.")
 
     def test_format_number(self):
         """
@@ -998,7 +1274,15 @@ class TestExport3MF(unittest.TestCase):
             (30.12, 1, "30.1"),
             (3.14159, 10, "3.14159"),
             (0, 0, "0"),
-            (0.1, 0, "0")
+            (0.1, 0, "0"),
+            (42.0, 4, "42"),
+            (-3.0, 2, "-3"),
+            (-0.0, 4, "0"),
+            (1e20, 4, "100000000000000000000"),
+            (10.4, 0, "10"),
+            (100.5, 2, "100.5"),
+            (-0.4, 0, "0"),
+            (-0.00001, 4, "0")
         ]
         for number, precision, result in tests:
             with self.subTest(number=number, precision=precision, result=result):
@@ -905,6 +905,40 @@ class TestImport3MF(unittest.TestCase):
             ground_truth,
             "Either one of the materials must be present, not both.")
 
+    def test_read_objects_mesh_released(self):
+        """
+        Tests that the mesh elements of objects are removed from the document once they have been read.
+        """
+        root = xml.etree.ElementTree.Element(f"{{{MODEL_NAMESPACE}}}model")
+        resources_node = xml.etree.ElementTree.SubElement(root, f"{{{MODEL_NAMESPACE}}}resources")
+        object_node = xml.etree.ElementTree.SubElement(resources_node, f"{{{MODEL_NAMESPACE}}}object")
+        object_node.attrib["id"] = "1"
+        mesh_node = xml.etree.ElementTree.SubElement(object_node, f"{{{MODEL_NAMESPACE}}}mesh")
+        vertices_node = xml.etree.ElementTree.SubElement(mesh_node, f"{{{MODEL_NAMESPACE}}}vertices")
+        for vertex in [(1.0, 2.0, 3.0), (4.0, 5.0, 6.0), (7.0, 8.0, 9.0)]:
+            xml.etree.ElementTree.SubElement(vertices_node, f"{{{MODEL_NAMESPACE}}}vertex", attrib={
+                "x": str(vertex[0]),
+                "y": str(vertex[1]),
+                "z": str(vertex[2])
+            })
+        triangles_node = xml.etree.ElementTree.SubElement(mesh_node, f"{{{MODEL_NAMESPACE}}}triangles")
+        xml.etree.ElementTree.SubElement(triangles_node, f"{{{MODEL_NAMESPACE}}}triangle", attrib={
+            "v1": "0",
+            "v2": "1",
+            "v3": "2"
+        })
+        self.importer.resource_objects = {}
+        self.importer.resource_materials = {}
+
+        self.importer.read_objects(root)
+
+        resource_object = self.importer.resource_objects["1"]
+        self.assertListEqual(resource_object.vertices, [(1.0, 2.0, 3.0), (4.0, 5.0, 6.0), (7.0, 8.0, 9.0)])
+        self.assertListEqual(resource_object.triangles, [(0, 1, 2)])
+        self.assertIsNone(
+            object_node.find("3mf:mesh", MODEL_NAMESPACES),
+            "After the mesh has been read, its elements are no longer needed in the document.")
+
     def test_read_vertices_missing(self):
         """
         Tests reading an object where the <vertices> element is missing.
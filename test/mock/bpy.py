@@ -17,6 +17,30 @@ The mocks in this module are meant to be very basic mocks. They will not return
 are just meant to remove the basic import errors and add the missing names.
 """
 
+import collections  # For namedtuple, to make lightweight stand-ins for mesh data.
+
+# Stand-ins for the vertices and triangles of a mesh. Tests may create many of these, and reading their attributes must
+# be cheap, so that they don't dominate the time spent in the code under test like MagicMock would.
+MockVertex = collections.namedtuple("MockVertex", ["co"])
+MockLoopTriangle = collections.namedtuple("MockLoopTriangle", ["vertices", "material_index"])
+
+
+class MockCollection(list):
+    """
+    List of mesh data that can copy a property of all of its items to a flat buffer, like Blender's collections.
+    """
+    def foreach_get(self, attribute, buffer):
+        values = []
+        for item in self:
+            value = getattr(item, attribute)
+            if isinstance(value, (tuple, list)):
+                values.extend(value)
+            else:
+                values.append(value)
+        if len(values) != len(buffer):
+            raise RuntimeError("The buffer must have exactly the size of the data to copy.")
+        buffer[:] = type(buffer)(buffer.typecode, values)
+
 
 class MockOperator:
     pass